@@ -3,17 +3,18 @@ Main file & entrypoint for project
 In charge of loading configuration, parsing command line arguments,
 and then performing the required actions:
 - run configuration utility
+- sync, search or bulk configure the inventory
 - do a test run
 - start webhook listener
 """
-import os, yaml, argparse, logging, sys, json
+import os, yaml, argparse, logging, sys, json, requests
 from flask import Flask, jsonify, request
 from queue import Queue
 from threading import Thread
 from shutil import copyfile
 from typing import Dict, Any, Optional
 
-from video_store_service import apiclient, record, config_util
+from video_store_service import apiclient, record, config_util, health, inventory, util
 
 # Configuration files
 template_config_file = 'config.yml.template'
@@ -51,6 +52,8 @@ def record_thread(ffmpeg_recorder: record.FFMPEGRecorder, q: Queue):
             return
         except ValueError:
             logging.error('ValueError during recording', exc_info=True)
+        except requests.RequestException:
+            logging.error('RequestException during recording', exc_info=True)
 
 
 def get_name(hook: Dict[Any, Any]) -> Optional[str]:
@@ -65,18 +68,10 @@ def get_name(hook: Dict[Any, Any]) -> Optional[str]:
     if 'extraInfo' not in hook:
         return
     timestamp = hook.get('createdOn', '').replace(':', '-')
-    device_name = hook['extraInfo'].get('Device name', '').replace(' ', '_')
+    device_name = hook['extraInfo'].get('Device name', '')
     if timestamp == '' or device_name == '':
         return
-    name = f'{timestamp}_{device_name}.mp4'
-    # https://stackoverflow.com/questions/7406102/create-sane-safe-filename-from-any-unsafe-string
-    file_name = "".join([c for c in name if
-                         c.isalpha()
-                         or c.isdigit()
-                         or c == '_'
-                         or c == '.'
-                         or c == '-']).rstrip()
-    return file_name
+    return util.get_file_name(f'{timestamp}_{device_name}.mp4')
 
 
 def create_app() -> Flask:
@@ -112,14 +107,21 @@ def create_app() -> Flask:
                     logging.info('Received webhook, will be saved as %s', name)
                     return jsonify({'success': True})
         return jsonify({'success': False})
+
+    # Circuit breaker state of every camera, so unreachable cameras can be spotted
+    @app.route("/status", methods=['GET'])
+    def status():
+        return jsonify({'queue_size': q.qsize(),
+                        'cameras': health_tracker.status()})
     return app
 
 
-# Get configuration Dict and an instance of the apiclient and recorder
+# Get configuration Dict and an instance of the apiclient, health tracker and recorder
 # Not inside if statement because it is also needed for the wsgi entry
 config = load_config()
 client = apiclient.Client(config['IXON_api'])
-recorder = record.FFMPEGRecorder(config, client)
+health_tracker = health.HealthTracker(config.get('health') or {}, client)
+recorder = record.FFMPEGRecorder(config, client, health_tracker)
 
 if __name__ == '__main__':
     """
@@ -130,13 +132,35 @@ if __name__ == '__main__':
     # Configure commandline arguments
     parser = argparse.ArgumentParser(description='IXON Video Store Service',
                                      usage='python -m video_store_service '
-                                           '[-h] [-c] [-t] [-w] [-p PORT] [-d]')
+                                           '[-h] [-c] [-s] [-f] [-q TERM] [-b TERM] '
+                                           '[-t] [-w] [-p PORT] [-d]')
 
     parser.add_argument('-c', '--configure',
                         action='store_true',
                         help='Opens configuration utility. '
                              'A short wizard to help you configure this module.')
 
+    parser.add_argument('-s', '--sync-inventory',
+                        action='store_true',
+                        help='Fetch all companies, devices and their services '
+                             'and cache them on disk.')
+
+    parser.add_argument('-f', '--full-sync',
+                        action='store_true',
+                        help='Sync the inventory, refetching the services of every device '
+                             'instead of only new or outdated ones. Implies --sync-inventory.')
+
+    parser.add_argument('-q', '--search',
+                        action='store',
+                        metavar='TERM',
+                        help='Search the cached inventory for services.')
+
+    parser.add_argument('-b', '--bulk-configure',
+                        action='store',
+                        metavar='TERM',
+                        help='Write a camera configuration template to the cameras folder '
+                             'for every service in the cached inventory matching TERM.')
+
     parser.add_argument('-t', '--test-recording',
                         action='store_true',
                         help='Immediately record, as if the webhook was called. '
@@ -161,8 +185,15 @@ if __name__ == '__main__':
     # Set logginglevel based on debug
     logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
 
+    # Full sync implies sync
+    if args.full_sync:
+        args.sync_inventory = True
+
+    inventory_requested = args.sync_inventory \
+        or args.search is not None or args.bulk_configure is not None
+
     # If nothing was enabled, display help & exit
-    if args.configure is False and args.test_recording is False and args.webhook is False:
+    if not (args.configure or inventory_requested or args.test_recording or args.webhook):
         parser.print_help()
         sys.exit()
 
@@ -170,6 +201,28 @@ if __name__ == '__main__':
     if args.configure:
         config_util.run_configuration_utility(config, client)
 
+    # Inventory sync, search and bulk configuration
+    if inventory_requested:
+        fleet = inventory.Inventory(config.get('inventory') or {}, client)
+        if args.sync_inventory:
+            try:
+                counts = fleet.sync(full=args.full_sync)
+                print(f'Synced {counts["companies"]} companies and {counts["agents"]} devices, '
+                      f'refreshed services of {counts["refreshed"]} devices, '
+                      f'{counts["failed"]} requests failed')
+            except (ValueError, requests.RequestException) as error:
+                print(f'Inventory sync failed: {error}')
+        if args.search is not None:
+            for row in fleet.search(args.search):
+                print(f'{row["company_name"]} / {row["agent_name"]} / {row["service_name"]}: '
+                      f'company_id: {row["company_id"]}, '
+                      f'webaccess_service_id: {row["service_id"]}')
+        if args.bulk_configure is not None:
+            written = fleet.write_camera_configs(fleet.search(args.bulk_configure),
+                                                 config['camera'])
+            print(f'Wrote {len(written)} camera configuration templates '
+                  f'to {inventory.cameras_folder}, copy the one you need into config.yml')
+
     # Test Recording
     if args.test_recording:
         recorder.do_test_run()
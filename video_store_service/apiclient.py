@@ -7,7 +7,7 @@ And establishing the data stream to be piped to ffmpeg
 
 import requests, re, logging
 from base64 import b64encode
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from requests.auth import HTTPDigestAuth
 
 
@@ -18,6 +18,19 @@ def get_auth_string(credentials: str) -> str:
     return f'Basic {b64encode(bytes(credentials, "utf-8")).decode()}'
 
 
+class UnreachableError(ValueError):
+    """
+    Raised when the IXON Cloud could not set up a webaccess connection,
+    usually because the router of the camera is offline
+    """
+
+
+class CameraStatusError(ValueError):
+    """
+    Raised when the camera was reached, but answered with an error status code
+    """
+
+
 class Client():
     """
     Class that handles connection to the IP camera through the IXON cloud
@@ -95,18 +108,15 @@ class Client():
             full_header['IXapi-Company'] = company_id
         return full_header
 
-    def get_webaccess_connection(self, camera_config: Dict[str, Any]) \
-            -> requests.Response:
+    def get_webaccess_url(self, camera_config: Dict[str, Any]) -> str:
         """
         Calls get_auth_header() to get auth
-        Gets Webaccess url
-        Connects to webacccess url to get cookie
-        connects to webaccess url to get video stream
+        Requests a webaccess url for the camera
 
         :param camera_config: class containing webhook-specific camera settings
-        :return: Response object, contains videostream
+        :return: str webaccess url, ValueError if the request was refused (4xx),
+                 UnreachableError if it failed otherwise
         """
-        ### get webaccess url ###
         request = requests.post(self.getURL('WebAccessList'),
                                 headers=self.get_auth_header(camera_config.get('company_id', '')),
                                 timeout=self.timeout,
@@ -114,16 +124,54 @@ class Client():
                                       'server':
                                           {'publicId': camera_config.get('webaccess_service_id', '')
                                            }})
+        if 400 <= request.status_code < 500 and not request.status_code == 408:
+            raise ValueError('WebAccess request was refused, check company_id and '
+                             f'webaccess_service_id, status code: {request.status_code}, '
+                             f'response: {request.content!r}')
         if not request.status_code == 201 or not request.json().get('status') == 'success':
-            raise ValueError('WebAccess request was not successfull, status code: '
-                             f'{request.status_code}, response: {request.content}')
-        server_url = request.json()['data']['url']
+            raise UnreachableError('WebAccess request was not successfull, status code: '
+                                   f'{request.status_code}, response: {request.content!r}')
+        return request.json()['data']['url']
+
+    def probe_webaccess(self, camera_config: Dict[str, Any]) -> bool:
+        """
+        Checks if the camera is reachable through the IXON Cloud,
+        connects to the video stream and closes it again right away
+        A camera that answers with an error status is reachable,
+        recording will report that error itself
+        :param camera_config: class containing webhook-specific camera settings
+        :return: True if the camera could be reached
+        """
+        with requests.Session() as session:
+            try:
+                self.get_webaccess_connection(camera_config, session).close()
+            except CameraStatusError:
+                return True
+            except (ValueError, requests.RequestException):
+                return False
+        return True
+
+    def get_webaccess_connection(self, camera_config: Dict[str, Any],
+                                 session: Optional[requests.Session] = None) \
+            -> requests.Response:
+        """
+        Calls get_webaccess_url() to get the Webaccess url
+        Connects to webacccess url to get cookie
+        connects to webaccess url to get video stream
+
+        :param camera_config: class containing webhook-specific camera settings
+        :param session: Optional: Session to connect with, a new one is created if None
+        :return: Response object, contains videostream
+        """
+        ### get webaccess url ###
+        server_url = self.get_webaccess_url(camera_config)
 
         ### Connect to IP Camera ###
         # First connect to authorize ourselves to the IXON Cloud & recieve a cookie
         # Do not redirect, we only want to talk to the platform, not the webserver from the camera
-        session = requests.Session()
-        session.get(server_url, allow_redirects=False)
+        if session is None:
+            session = requests.Session()
+        session.get(server_url, allow_redirects=False, timeout=self.timeout)
 
         # Now we no longer need the ?auth=XXXXXX part
         result: Any = re.search('(.+?)\?auth', server_url)
@@ -162,5 +210,5 @@ class Client():
             access = session.get(url, **kwargs)
 
         if not access.status_code == 200:
-            raise ValueError('Recieved status code: {access.status_code}')
+            raise CameraStatusError(f'Recieved status code: {access.status_code}')
         return access
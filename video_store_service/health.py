@@ -0,0 +1,159 @@
+"""
+Keeps track of the health of the cameras
+
+Every camera gets its own circuit breaker.
+After a number of failed connection attempts the circuit opens,
+recordings for that camera then fail immediately instead of waiting
+for the IXON api to time out, so the other cameras are not held up.
+While the circuit is open a background thread probes the camera now and then,
+once a probe succeeds the circuit closes again.
+"""
+import logging
+from threading import Thread, Lock
+from time import sleep, time
+from typing import Dict, Any, Callable
+
+from video_store_service import apiclient
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+
+
+def get_camera_id(camera_config: Dict[str, Any]) -> str:
+    """
+    Creates an identifier for a camera based on its configuration
+    :param camera_config: Dict with camera configuration options
+    :return: str company_id/webaccess_service_id
+    """
+    return f'{camera_config.get("company_id", "")}/' \
+           f'{camera_config.get("webaccess_service_id", "")}'
+
+
+class CircuitBreaker():
+    """
+    Circuit breaker for a single camera
+    """
+    def __init__(self, name: str,
+                 failure_threshold: int,
+                 probe_interval: int,
+                 probe: Callable[[], bool]):
+        """
+        :param name: name of the camera, used for logging
+        :param failure_threshold: amount of consecutive failures before the circuit opens
+        :param probe_interval: seconds between probes while the circuit is open
+        :param probe: function that checks if the camera is reachable again
+        """
+        self.__name = name
+        self.__failure_threshold = failure_threshold
+        self.__probe_interval = probe_interval
+        self.__probe = probe
+        self.__lock = Lock()
+        # State and statistics, as returned by status()
+        self.__status: Dict[str, Any] = {
+            'state': CLOSED,
+            'failures': 0,
+            'opened_at': None,
+            'last_failure': None,
+            'last_success': None,
+        }
+
+    def allow_request(self) -> bool:
+        """
+        :return: True if a recording may be attempted, False if the circuit is open
+        """
+        with self.__lock:
+            return self.__status['state'] == CLOSED
+
+    def record_success(self):
+        """
+        Resets the failure count and closes the circuit
+        """
+        with self.__lock:
+            if self.__status['state'] == OPEN:
+                logging.info('Camera %s is reachable again, closing circuit', self.__name)
+            self.__status.update(state=CLOSED, failures=0, opened_at=None, last_success=time())
+
+    def record_failure(self):
+        """
+        Counts a failure, opens the circuit and starts the prober
+        once the failure threshold is reached
+        """
+        with self.__lock:
+            self.__status['failures'] += 1
+            self.__status['last_failure'] = time()
+            if self.__status['state'] == OPEN \
+                    or self.__status['failures'] < self.__failure_threshold:
+                return
+            self.__status.update(state=OPEN, opened_at=time())
+        logging.warning('Camera %s failed %d times, opening circuit',
+                        self.__name, self.__failure_threshold)
+        prober = Thread(name=f'probe_thread_{self.__name}',
+                        target=self.__probe_thread,
+                        daemon=True)
+        prober.start()
+
+    def __probe_thread(self):
+        """
+        While the circuit is open, probe the camera every probe_interval seconds
+        Closes the circuit on the first successful probe
+        :return: nothing
+        """
+        while not self.allow_request():
+            sleep(self.__probe_interval)
+            try:
+                reachable = self.__probe()
+            except Exception:  # pylint: disable=broad-except
+                logging.debug('Probe of camera %s failed', self.__name, exc_info=True)
+                reachable = False
+            if reachable:
+                self.record_success()
+            else:
+                logging.debug('Camera %s is still unreachable', self.__name)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        :return: Dict with the current state of this circuit breaker
+        """
+        with self.__lock:
+            return dict(self.__status)
+
+
+class HealthTracker():
+    """
+    Holds a circuit breaker for every camera that has been recorded from
+    """
+    def __init__(self, health_config: Dict[str, Any], client: apiclient.Client):
+        """
+        :param health_config: Dict with health configuration options
+        :param client: Apiclient class instance, used to probe the cameras
+        """
+        self.__failure_threshold = int(health_config.get('failure_threshold', 3))
+        self.__probe_interval = int(health_config.get('probe_interval', 30))
+        self.__client = client
+        self.__lock = Lock()
+        self.__breakers: Dict[str, CircuitBreaker] = {}
+
+    def get_breaker(self, camera_config: Dict[str, Any]) -> CircuitBreaker:
+        """
+        Gets the circuit breaker belonging to a camera, creates it if there is none yet
+        :param camera_config: Dict with camera configuration options
+        :return: CircuitBreaker of this camera
+        """
+        camera_id = get_camera_id(camera_config)
+        with self.__lock:
+            if camera_id not in self.__breakers:
+                self.__breakers[camera_id] = CircuitBreaker(
+                    camera_id,
+                    self.__failure_threshold,
+                    self.__probe_interval,
+                    lambda: self.__client.probe_webaccess(camera_config))
+            return self.__breakers[camera_id]
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: Dict with the state of every circuit breaker, by camera id
+        """
+        with self.__lock:
+            breakers = dict(self.__breakers)
+        return {camera_id: breaker.status() for camera_id, breaker in breakers.items()}
@@ -0,0 +1,321 @@
+"""
+Inventory of all companies, devices (agents) and their services
+
+Fetches everything the account has access to from the IXON api,
+following pagination and using a pool of worker threads,
+and caches it on disk so it can be searched without calling the api.
+Camera configuration templates can be written for many services at once,
+instead of going through the configuration wizard for each of them.
+The service does not load these, copy the one you need into config.yml.
+"""
+import os, json, copy, logging, requests, yaml
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Lock
+from time import time
+from typing import List, Dict, Any, Optional, Tuple
+from requests.adapters import HTTPAdapter
+
+from video_store_service import apiclient, util
+
+# Folder the camera configuration templates are written to
+cameras_folder = 'cameras'
+
+
+class InventoryApi():
+    """
+    Thread safe access to the paginated lists of the IXON api
+    All requests share one session with a bounded connection pool and one auth header
+    """
+    def __init__(self, client: apiclient.Client, workers: int, page_size: int):
+        """
+        :param client: Apiclient class instance to get the urls and auth header from
+        :param workers: amount of threads that will use this class at the same time
+        :param page_size: amount of items to request per page
+        """
+        self.__client = client
+        self.__page_size = page_size
+
+        # Session with a connection pool large enough for all workers
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.__session.mount('https://', adapter)
+
+        # Auth header is shared by all workers, only login again when it is about to expire
+        self.__header_lock = Lock()
+        self.__header: Optional[Dict[str, str]] = None
+        self.__header_time = 0.0
+
+    def __get_header(self, company_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        Gets the shared auth header, logs in again once half of the token lifetime has passed
+        :param company_id: Optional: ID of the company to add to the header
+        :return: full_header with authorization and company_id if defined
+        """
+        with self.__header_lock:
+            if self.__header is None \
+                    or time() - self.__header_time > self.__client.expires_in / 2:
+                self.__header = self.__client.get_auth_header()
+                self.__header_time = time()
+            header = self.__header.copy()
+        if company_id is not None:
+            header['IXapi-Company'] = company_id
+        return header
+
+    def __get_all_pages(self, url: str,
+                        company_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Requests every page of a list from the IXON api
+        :param url: URL of the list
+        :param company_id: Optional: ID of the company the list belongs to
+        :return: List with the data of all pages combined
+        """
+        items: List[Dict[str, Any]] = []
+        params = {'page-size': self.__page_size}
+        while True:
+            response = self.__session.get(url,
+                                          headers=self.__get_header(company_id),
+                                          params=params,
+                                          timeout=self.__client.timeout)
+            if not response.status_code == 200 or not response.json().get('status') == 'success':
+                raise ValueError(
+                    'Invalid response: status code: '
+                    f'{response.status_code}, response: {response.text}')
+            reply = response.json()
+            items.extend(reply.get('data', []))
+            if not reply.get('moreAfter'):
+                return items
+            params['page-after'] = reply['moreAfter']
+
+    def get_companies(self) -> List[Dict[str, Any]]:
+        """
+        :return: List with all companies
+        """
+        return self.__get_all_pages(self.__client.getURL('CompanyList'))
+
+    def get_agents(self, company_id: str) -> List[Dict[str, Any]]:
+        """
+        :param company_id: ID of the company
+        :return: List with all agents in the company
+        """
+        return self.__get_all_pages(self.__client.getURL('AgentList'), company_id)
+
+    def get_services(self, company_id: str, agent_id: str) -> List[Dict[str, Any]]:
+        """
+        :param company_id: ID of the company the agent is in
+        :param agent_id: ID of the agent
+        :return: List with publicId and name of all services on the agent
+        """
+        services = self.__get_all_pages(
+            self.__client.getURL('AgentServerList').replace('{agentId}', agent_id),
+            company_id)
+        return [{'publicId': service['publicId'], 'name': service.get('name') or ''}
+                for service in services]
+
+
+class Inventory():
+    """
+    Class that syncs, caches and searches the inventory of the IXON account
+    """
+    def __init__(self, inventory_config: Dict[str, Any], client: apiclient.Client):
+        """
+        :param inventory_config: Dict with inventory configuration options
+        :param client: Apiclient class instance to get the urls and auth header from
+        """
+        self.__cache_file = inventory_config.get('cache_file', 'inventory.json')
+        self.__workers = int(inventory_config.get('workers', 8))
+        self.__max_age = int(inventory_config.get('max_age', 86400))
+        self.__api = InventoryApi(client,
+                                  self.__workers,
+                                  int(inventory_config.get('page_size', 500)))
+        self.__cache = self.load()
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Loads the cached inventory from disk
+        :return: Dict with cached inventory, empty if there is no cache yet
+        """
+        if not os.access(self.__cache_file, os.R_OK):
+            return {'synced': None, 'companies': {}}
+        with open(self.__cache_file, 'r') as cache_f:
+            return json.load(cache_f)
+
+    def save(self):
+        """
+        Writes the inventory to disk, through a temporary file
+        so a failed write does not corrupt the existing cache
+        :return: nothing
+        """
+        temp_file = f'{self.__cache_file}.tmp'
+        with open(temp_file, 'w') as cache_f:
+            json.dump(self.__cache, cache_f)
+        os.replace(temp_file, self.__cache_file)
+
+    def __build_agents(self, agents: List[Dict[str, Any]],
+                       cached_agents: Dict[str, Any],
+                       full: bool) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Builds the agents of a company, keeping the cached services of agents that are still fresh
+        :param agents: List with agents as received from the api
+        :param cached_agents: Dict with the cached agents of the company, by publicId
+        :param full: treat every agent as stale
+        :return: Tuple[Dict with agents by publicId, List with IDs of the stale agents]
+        """
+        new_agents: Dict[str, Any] = {}
+        stale = []
+        for agent in agents:
+            agent_id = agent['publicId']
+            cached_agent = cached_agents.get(agent_id)
+            if not full and cached_agent is not None \
+                    and time() - (cached_agent.get('fetched') or 0) < self.__max_age:
+                new_agents[agent_id] = dict(cached_agent, name=agent.get('name') or '')
+            else:
+                # Keep the cached services until the new ones have been fetched
+                new_agents[agent_id] = {
+                    'name': agent.get('name') or '',
+                    'fetched': None,
+                    'services': (cached_agent or {}).get('services', [])}
+                stale.append(agent_id)
+        return new_agents, stale
+
+    @staticmethod
+    def __apply_services(agents: Dict[str, Any],
+                         agent_id: str,
+                         service_future: Future) -> bool:
+        """
+        Stores the result of a services request in its agent
+        On failure the agent keeps its cached services and stays stale
+        :param agents: Dict with the agents of the company, by publicId
+        :param agent_id: ID of the agent the services belong to
+        :param service_future: Future with the result of the services request
+        :return: True if the services were refreshed, False if the request failed
+        """
+        try:
+            services = service_future.result()
+        except (ValueError, requests.RequestException):
+            logging.error('Failed to get services of agent %s, keeping cached services',
+                          agent_id, exc_info=True)
+            return False
+        agents[agent_id]['services'] = services
+        agents[agent_id]['fetched'] = time()
+        return True
+
+    def __get_company_agents(self, company_id: str,
+                             agent_future: Future,
+                             full: bool,
+                             counts: Dict[str, int]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Builds the agents of a company from the result of its agent list request
+        If the request failed, the cached agents are kept and failed is increased
+        :param company_id: ID of the company
+        :param agent_future: Future with the result of the agent list request
+        :param full: treat every agent as stale
+        :param counts: Dict with counts of the sync
+        :return: Tuple[Dict with agents by publicId, List with IDs of the stale agents]
+        """
+        cached_agents = self.__cache.get('companies', {}).get(company_id, {}).get('agents', {})
+        try:
+            return self.__build_agents(agent_future.result(), cached_agents, full)
+        except (ValueError, requests.RequestException):
+            logging.error('Failed to get agents of company %s, keeping cached agents',
+                          company_id, exc_info=True)
+            counts['failed'] += 1
+            return cached_agents, []
+
+    def sync(self, full: bool = False) -> Dict[str, int]:
+        """
+        Refreshes the cached inventory
+        Companies and agent lists are always fetched again,
+        services only for agents that are new or whose cached services are older than max_age
+        Requests that fail are logged, the affected entries keep their cached data
+        and will be fetched again on the next sync
+        :param full: refetch the services of every agent, regardless of their age
+        :return: Dict with the amount of companies, agents, refreshed agents and failed requests
+        """
+        companies = self.__api.get_companies()
+        logging.info('Found %d companies', len(companies))
+        counts = {'refreshed': 0, 'failed': 0}
+
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            # Fetch agent lists of all companies concurrently
+            agent_futures = [executor.submit(self.__api.get_agents, company['publicId'])
+                             for company in companies]
+
+            # Build the new inventory and request the services of the stale agents
+            new_companies: Dict[str, Any] = {}
+            service_futures: List[Tuple[Dict[str, Any], str, Future]] = []
+            for company, agent_future in zip(companies, agent_futures):
+                company_id = company['publicId']
+                agents, stale = self.__get_company_agents(company_id, agent_future, full, counts)
+                new_companies[company_id] = {'name': company.get('name') or '', 'agents': agents}
+                service_futures.extend(
+                    (agents, agent_id, executor.submit(self.__api.get_services,
+                                                       company_id, agent_id))
+                    for agent_id in stale)
+            logging.info('Refreshing services of %d agents', len(service_futures))
+
+            for agents, agent_id, service_future in service_futures:
+                counts['refreshed' if self.__apply_services(agents, agent_id, service_future)
+                       else 'failed'] += 1
+
+        self.__cache = {'synced': time(), 'companies': new_companies}
+        self.save()
+        return dict(counts,
+                    companies=len(new_companies),
+                    agents=sum(len(company['agents']) for company in new_companies.values()))
+
+    def search(self, term: str = '') -> List[Dict[str, str]]:
+        """
+        Searches the cached inventory for services
+        Every word of the term has to occur in the company, agent or service name or id
+        :param term: search term, case insensitive, empty matches everything
+        :return: List with a Dict per matching service
+        """
+        words = term.lower().split()
+        results = []
+        for company_id, company in self.__cache.get('companies', {}).items():
+            for agent_id, agent in company.get('agents', {}).items():
+                for service in agent.get('services', []):
+                    row = {'company_id': company_id,
+                           'company_name': company.get('name', ''),
+                           'agent_id': agent_id,
+                           'agent_name': agent.get('name', ''),
+                           'service_id': service['publicId'],
+                           'service_name': service.get('name', '')}
+                    text = ' '.join(str(value) for value in row.values()).lower()
+                    if all(word in text for word in words):
+                        results.append(row)
+        return results
+
+    def write_camera_configs(self, results: List[Dict[str, str]],
+                             camera_config: Dict[str, Any]) -> List[str]:
+        """
+        Writes a camera configuration template for every search result
+        Uses camera_config for the settings that are not in the inventory,
+        such as the access type and stream_path
+        Credentials are not copied, the auth username and password are left empty
+        Existing files are not overwritten, they may contain manual changes
+        :param results: List with search results
+        :param camera_config: Dict with the camera settings to start from
+        :return: List with the paths of the written files
+        """
+        folder = os.path.join(os.getcwd(), cameras_folder)
+        os.makedirs(folder, exist_ok=True)
+
+        written = []
+        for row in results:
+            file_name = util.get_file_name(
+                f'{row["agent_name"]}_{row["service_name"]}_{row["service_id"]}.yml')
+            path = os.path.join(folder, file_name)
+            if os.path.isfile(path):
+                logging.info('%s already exists, skipped', path)
+                continue
+            camera = copy.deepcopy(camera_config)
+            camera['auth'] = {'type': (camera_config.get('auth') or {}).get('type', 'none'),
+                              'username': '',
+                              'password': ''}
+            camera['company_id'] = row['company_id']
+            camera['webaccess_service_id'] = row['service_id']
+            with open(path, 'w') as camera_f:
+                yaml.dump({'camera': camera}, camera_f, default_flow_style=False)
+            written.append(path)
+        return written
@@ -9,7 +9,7 @@ from threading import Thread
 from time import sleep
 from typing import List, Tuple, Dict, Any
 
-from video_store_service import apiclient
+from video_store_service import apiclient, health
 
 # Recording may take at most 15 times the supposed recording duration
 
@@ -132,21 +132,36 @@ class FFMPEGRecorder():
     """
     Class for recording videostream with ffmpeg
     """
-    def __init__(self, config: Dict[str, Any], client: apiclient.Client):
+    def __init__(self, config: Dict[str, Any],
+                 client: apiclient.Client,
+                 health_tracker: health.HealthTracker):
         """
         :param config: Dict with configuration options
         :param client: Apiclient class instance to get the video stream from
+        :param health_tracker: HealthTracker class instance with the camera's circuit breakers
         """
         self.__config = config
         self.__client = client
+        self.__health_tracker = health_tracker
 
     def record(self, file_name: str) -> Tuple[bool, str]:
         """
         :param file_name: file_name of output file (with file extension)
         :return: Tuple[success: bool, message: str]
         """
+        # Fail fast if the camera is known to be unreachable
+        breaker = self.__health_tracker.get_breaker(self.__config['camera'])
+        if not breaker.allow_request():
+            return False, 'Camera is unreachable (circuit open), skipped recording'
+
         # Get webaccess to camera
-        access = self.__client.get_webaccess_connection(self.__config['camera'])
+        # Only count failures to reach the camera, not configuration or camera errors
+        try:
+            access = self.__client.get_webaccess_connection(self.__config['camera'])
+        except (apiclient.UnreachableError, requests.RequestException):
+            breaker.record_failure()
+            raise
+        breaker.record_success()
 
         # Record using ffmpeg
         cmd = get_ffmpeg_command(file_name, self.__config['video'])
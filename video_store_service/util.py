@@ -0,0 +1,19 @@
+"""
+Small helper functions shared by the other modules
+"""
+
+
+def get_file_name(name: str) -> str:
+    """
+    Replaces spaces with '_' and removes any characters that are not
+    regular characters, numbers, '_' '.' or '-' to ensure the filename is valid
+    :param name: unsafe name
+    :return: str safe file name
+    """
+    # https://stackoverflow.com/questions/7406102/create-sane-safe-filename-from-any-unsafe-string
+    return "".join([c for c in name.replace(' ', '_') if
+                    c.isalpha()
+                    or c.isdigit()
+                    or c == '_'
+                    or c == '.'
+                    or c == '-'])